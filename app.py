@@ -1,31 +1,45 @@
 #!/usr/bin/env python3
 """
-AI OCR Flask Application
+AI OCR Quart Application
 A web-based OCR tool using OpenRouter API for text extraction from images
 """
 
 import os
-import json
+import time
+import asyncio
+import hashlib
+import secrets
 import logging
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify, session
-from flask_cors import CORS
-import requests
+import itertools
+from collections import OrderedDict, deque
+from quart import Quart, render_template, request, session
+from quart_cors import cors
+from werkzeug.exceptions import RequestEntityTooLarge
+import httpx
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from cachetools import TTLCache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-app.secret_key = os.urandom(24)  # For session management
-CORS(app)  # Enable CORS for all routes
+# Initialize Quart app
+app = Quart(__name__)
+# For session management; must be shared by all server workers to read each other's cookies
+app.secret_key = os.environ.get('AI-OCR_SECRET_KEY') or os.urandom(24)
+# Quart's 60s total limits would cut off long OCR streams and slow large uploads;
+# upstream reads keep their own 60s per-read timeout
+app.config['RESPONSE_TIMEOUT'] = None
+app.config['BODY_TIMEOUT'] = None
+app = cors(app)  # Enable CORS for all routes
 
 # Load configuration
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.json')
 try:
-    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    with open(CONFIG_PATH, 'rb') as f:
+        config = orjson.loads(f.read())
     logger.info("Configuration loaded successfully")
 except Exception as e:
     logger.error(f"Failed to load configuration: {e}")
@@ -47,232 +61,507 @@ else:
     logger.error("AI-OCR_API_KEYS environment variable is not set")
     config['api_key'] = ''
 
-# In-memory session storage for history (per session)
+# Box markers some models wrap their output in
+BEGIN_MARKER = "<|begin_of_box|>"
+END_MARKER = "<|end_of_box|>"
+
+OPENROUTER_URL = 'https://openrouter.ai/api/v1/chat/completions'
+
+# Values derived from config are fixed for the process lifetime, so build them once
+DEFAULT_MODEL = config.get('default_model')
+DEFAULT_REASONING = config.get('enable_reasoning_by_default', True)
+SYSTEM_MSG = {'role': 'system', 'content': config.get('system_prompt', '')}
+MODELS_PAYLOAD = orjson.dumps({
+    'models': config.get('models', []),
+    'default_model': config.get('default_model', ''),
+    'enable_reasoning_by_default': config.get('enable_reasoning_by_default', 'true')
+})
+MAX_PAYLOAD = config.get('max_image_bytes', 20 * 1024 * 1024)
+STATIC_HEADERS = {
+    'Authorization': f'Bearer {config["api_key"]}',
+    'Content-Type': 'application/json',
+    'HTTP-Referer': config.get('http_referer', 'https://aiocr.app'),
+    'X-Title': config.get('x_title', 'AI OCR Tool')
+}
+
+# Accepted image URL forms and upload size limit (images plus room for the rest of the JSON)
+IMAGE_URL_PREFIXES = ('data:image/', 'http://', 'https://')
+app.config['MAX_CONTENT_LENGTH'] = MAX_PAYLOAD + 1024 * 1024
+
+# Recent OCR results keyed by a hash of their inputs, so repeated images skip the upstream call
+# Bounded by total size rather than entry count, since streamed results can be megabytes each
+result_cache = TTLCache(maxsize=config.get('result_cache_bytes', 64 * 1024 * 1024),
+                        ttl=config.get('result_cache_ttl', 3600),
+                        getsizeof=len)
+
+# Cap on in-flight OpenRouter requests; callers wait briefly for a slot and get 503 otherwise
+MAX_CONCURRENT_UPSTREAM = config.get('max_concurrent_upstream', 64)
+UPSTREAM_QUEUE_TIMEOUT = config.get('upstream_queue_timeout', 10)
+upstream_slots = asyncio.Semaphore(MAX_CONCURRENT_UPSTREAM)
+
+# Shared HTTP client for OpenRouter, created inside the event loop at startup
+http_client = None
+
+@app.before_serving
+async def create_http_client():
+    """Open the pooled HTTP/2 client used for all upstream requests"""
+    global http_client
+    # HTTP/2 multiplexes concurrent OCR requests over a few connections; idle
+    # connections are kept long enough to be reused at human request pace
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(60.0),
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENT_UPSTREAM,
+            max_keepalive_connections=64,
+            keepalive_expiry=120
+        )
+    )
+
+@app.after_serving
+async def close_http_client():
+    """Close the pooled HTTP client on shutdown"""
+    await http_client.aclose()
+
+# Session history is kept in Redis when configured, so it is shared by all workers
+# and survives restarts; otherwise it falls back to per-process memory
+REDIS_URL = os.environ.get('AI-OCR_REDIS_URL') or config.get('redis_url')
+HISTORY_KEY_PREFIX = 'ai-ocr:history:'
+HISTORY_ID_KEY = 'ai-ocr:history-id'  # Shared counter so entry ids are unique across workers
+HISTORY_TTL = 86400  # Seconds to keep a session's history after its last OCR
+redis_client = None
+
+@app.before_serving
+async def create_redis_client():
+    """Connect to Redis for session history if configured"""
+    global redis_client
+    if REDIS_URL:
+        # Short timeouts so an unreachable Redis cannot stall OCR responses
+        redis_client = aioredis.from_url(REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+        logger.info("Session history stored in Redis")
+
+@app.after_serving
+async def close_redis_client():
+    """Close the Redis connection pool on shutdown"""
+    if redis_client is not None:
+        await redis_client.aclose()
+
+# In-memory fallback storage for history (per session)
 # Note: This will be lost when the server restarts
-session_history = {}
+MAX_HISTORY = 50
+MAX_SESSIONS = 10_000
+session_history = OrderedDict()  # session_id -> deque, least recently used first
+history_ids = itertools.count()
 
-def get_session_history():
-    """Get or create history list for current session"""
+def get_session_id(create=True):
+    """Get the id of the current session, creating one if requested"""
     session_id = session.get('session_id')
-    if not session_id:
-        session_id = os.urandom(16).hex()
+    if not session_id and create:
+        session_id = secrets.token_hex(16)
         session['session_id'] = session_id
-        session_history[session_id] = []
-    return session_history.get(session_id, [])
+    return session_id
+
+def get_local_history(session_id):
+    """Get or create the in-memory history deque for a session"""
+    history = session_history.get(session_id)
+    if history is None:
+        history = session_history[session_id] = deque(maxlen=MAX_HISTORY)
+        # Evict the least recently used session once the cap is exceeded
+        if len(session_history) > MAX_SESSIONS:
+            session_history.popitem(last=False)
+    else:
+        session_history.move_to_end(session_id)
+    return history
 
-def add_to_history(text):
+async def get_session_history():
+    """Get history entries for current session, newest first"""
+    # A session without an id has never recorded anything, so don't create one just to read
+    session_id = get_session_id(create=False)
+    if not session_id:
+        return []
+    if redis_client is not None:
+        # History is a convenience, so a Redis outage degrades to an empty list
+        try:
+            entries = await redis_client.lrange(HISTORY_KEY_PREFIX + session_id, 0, MAX_HISTORY - 1)
+        except RedisError as e:
+            logger.error(f"Failed to read history from Redis: {e}")
+            return []
+        return [orjson.loads(entry) for entry in entries]
+    history = session_history.get(session_id)
+    if history is None:
+        return []
+    session_history.move_to_end(session_id)
+    return list(history)
+
+async def add_to_history(text):
     """Add text to session history"""
-    history = get_session_history()
-    history.insert(0, {
-        'id': len(history),
-        'time': datetime.now().strftime('%H:%M:%S'),
-        'text': text
-    })
-    # Keep only last 50 items
-    if len(history) > 50:
-        history = history[:50]
-    session_id = session.get('session_id')
-    if session_id:
-        session_history[session_id] = history
+    session_id = get_session_id()
+    entry_time = time.strftime('%H:%M:%S')
+    if redis_client is not None:
+        key = HISTORY_KEY_PREFIX + session_id
+        # Never fail an already completed OCR because history could not be saved
+        try:
+            entry = {
+                'id': await redis_client.incr(HISTORY_ID_KEY),
+                'time': entry_time,
+                'text': text
+            }
+            await (redis_client.pipeline()
+                   .lpush(key, orjson.dumps(entry))
+                   .ltrim(key, 0, MAX_HISTORY - 1)
+                   .expire(key, HISTORY_TTL)
+                   .execute())
+        except RedisError as e:
+            logger.error(f"Failed to save history to Redis: {e}")
+    else:
+        get_local_history(session_id).appendleft({
+            'id': next(history_ids),
+            'time': entry_time,
+            'text': text
+        })
+
+def json_response(obj, status=200):
+    """Serialize obj with orjson into a JSON response"""
+    return app.response_class(orjson.dumps(obj), mimetype='application/json', status=status)
+
+async def _get_json_body():
+    """Parse the request body with orjson, returning None if it is empty or invalid"""
+    raw = await request.get_data(cache=False)
+    if not raw:
+        return None
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None
+
+def _check_images(images):
+    """Return an error response if images are malformed or too large, else None"""
+    if not isinstance(images, list):
+        return json_response({'error': 'Invalid images'}, 400)
+    total = 0
+    # Plain loop rather than sum() so oversized uploads are rejected as early as possible
+    for img in images:
+        if not isinstance(img, str) or not img.startswith(IMAGE_URL_PREFIXES):
+            return json_response({'error': 'Invalid image URL'}, 400)
+        total += len(img)
+        if total > MAX_PAYLOAD:
+            return json_response({'error': 'Images too large'}, 413)
+    return None
+
+async def _acquire_upstream_slot():
+    """Wait for a free upstream slot, returning False if none frees up in time"""
+    try:
+        await asyncio.wait_for(upstream_slots.acquire(), UPSTREAM_QUEUE_TIMEOUT)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+def _result_cache_key(images, user_prompt, model_id, enable_reasoning, stream):
+    """Hash everything that determines an OCR result into a cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    # Image order matters to the output, so hash images in the order given
+    for img in images:
+        digest.update(img.encode())
+        digest.update(b'\0')
+    digest.update(orjson.dumps([user_prompt, model_id, bool(enable_reasoning), stream]))
+    return digest.digest()
+
+def _cache_result(cache_key, value):
+    """Store an OCR result, skipping values too large to fit in the cache at all"""
+    if len(value) <= result_cache.maxsize:
+        result_cache[cache_key] = value
+
+def _is_complete_stream(body):
+    """Check that an SSE body ended with [DONE] and carried no error events"""
+    if not body.rstrip().endswith(b'data: [DONE]'):
+        return False
+    for line in body.splitlines():
+        if not line.startswith(b'data: ') or line == b'data: [DONE]':
+            continue
+        try:
+            event = orjson.loads(line[6:])
+        except orjson.JSONDecodeError:
+            return False
+        if not isinstance(event, dict):
+            continue
+        # OpenRouter reports mid-stream failures as events with an error or error finish_reason
+        if 'error' in event:
+            return False
+        for choice in event.get('choices') or ():
+            if choice.get('finish_reason') == 'error':
+                return False
+    return True
+
+class UpstreamStream:
+    """Response body proxying an upstream SSE stream
+
+    Owns the upstream response and its concurrency slot and releases both in
+    aclose(), which Quart calls when the body is closed even if it was never
+    iterated (e.g. the client disconnected before streaming started).
+    """
+
+    def __init__(self, response, cache_key):
+        self.response = response
+        self.cache_key = cache_key
+        self.chunks = []  # Buffered for the result cache; None once too large to cache
+        self.buffered_bytes = 0
+        self.iterator = None
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.iterator is None:
+            # Upstream already frames SSE events, so pass transport chunks through as-is
+            self.iterator = self.response.aiter_bytes()
+        try:
+            chunk = await self.iterator.__anext__()
+            while not chunk:
+                chunk = await self.iterator.__anext__()
+        except StopAsyncIteration:
+            # Only cache streams that finished cleanly, never transient upstream errors
+            if self.chunks is not None:
+                body = b''.join(self.chunks)
+                if _is_complete_stream(body):
+                    _cache_result(self.cache_key, body)
+            await self.aclose()
+            raise
+        except BaseException:
+            await self.aclose()
+            raise
+        if self.chunks is not None:
+            self.buffered_bytes += len(chunk)
+            if self.buffered_bytes > result_cache.maxsize:
+                # Could never be cached, so stop holding a copy of the stream
+                self.chunks = None
+            else:
+                self.chunks.append(chunk)
+        return chunk
+
+    async def aclose(self):
+        """Close the upstream response and free its slot, at most once"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.response.aclose()
+        finally:
+            upstream_slots.release()
+
+def _build_request_body(images, user_prompt, model_id, enable_reasoning, stream):
+    """Build the OpenRouter chat completion request body"""
+    user_content = [{'type': 'text', 'text': user_prompt or 'Extract text'}]
+    user_content.extend({'type': 'image_url', 'image_url': {'url': img}} for img in images)
+
+    request_body = {
+        'model': model_id,
+        'messages': [SYSTEM_MSG, {'role': 'user', 'content': user_content}],
+        'stream': stream
+    }
+
+    # Add reasoning if enabled
+    if enable_reasoning:
+        request_body['reasoning'] = {'enabled': True}
+
+    return request_body
 
 @app.route('/')
-def index():
+async def index():
     """Render main page"""
-    enable_reasoning_by_default = config.get('enable_reasoning_by_default', True)
-    return render_template('index.html',
+    return await render_template('index.html',
                          config=config,
                          models=config.get('models', []),
                          default_model=config.get('default_model', ''),
-                         enable_reasoning_checked=enable_reasoning_by_default)
+                         enable_reasoning_checked=DEFAULT_REASONING)
 
 @app.route('/api/models', methods=['GET'])
-def get_models():
+async def get_models():
     """Return available models"""
-    return jsonify({
-        'models': config.get('models', []),
-        'default_model': config.get('default_model', ''),
-        'enable_reasoning_by_default': config.get('enable_reasoning_by_default', 'true')
-    })
+    return app.response_class(MODELS_PAYLOAD, mimetype='application/json')
 
 @app.route('/api/history', methods=['GET'])
-def get_history():
+async def get_history():
     """Get session history"""
-    history = get_session_history()
-    return jsonify({'history': history})
+    history = await get_session_history()
+    return json_response({'history': history})
 
 @app.route('/api/recognize', methods=['POST'])
-def recognize_text():
+async def recognize_text():
     """Process OCR request"""
     try:
-        data = request.json
+        data = await _get_json_body()
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return json_response({'error': 'No data provided'}, 400)
 
         images = data.get('images', [])
         user_prompt = data.get('prompt', '')
-        model_id = data.get('model', config.get('default_model'))
-        enable_reasoning = data.get('enable_reasoning', config.get('enable_reasoning_by_default', True))
+        model_id = data.get('model', DEFAULT_MODEL)
+        enable_reasoning = data.get('enable_reasoning', DEFAULT_REASONING)
 
         if not images:
-            return jsonify({'error': 'No images provided'}), 400
-
-        # Prepare messages for OpenRouter API
-        messages = [
-            {
-                'role': 'system',
-                'content': config.get('system_prompt', '')
-            },
-            {
-                'role': 'user',
-                'content': [
-                    {'type': 'text', 'text': user_prompt or 'Extract text'},
-                    *[{'type': 'image_url', 'image_url': {'url': img}} for img in images]
-                ]
-            }
-        ]
-
-        # Prepare request body
-        request_body = {
-            'model': model_id,
-            'messages': messages,
-            'stream': False  # We'll handle streaming on frontend through Flask
-        }
-
-        # Add reasoning if enabled
-        if enable_reasoning:
-            request_body['reasoning'] = {'enabled': True}
-
-        # Make request to OpenRouter API
-        headers = {
-            'Authorization': f'Bearer {config.get("api_key")}',
-            'Content-Type': 'application/json',
-            'HTTP-Referer': config.get('http_referer', 'https://aiocr.app'),
-            'X-Title': config.get('x_title', 'AI OCR Tool')
-        }
+            return json_response({'error': 'No images provided'}, 400)
+
+        error_response = _check_images(images)
+        if error_response is not None:
+            return error_response
+
+        cache_key = _result_cache_key(images, user_prompt, model_id, enable_reasoning, stream=False)
+        text_content = result_cache.get(cache_key)
+        if text_content is not None:
+            logger.info(f"Serving cached OCR result for model: {model_id}")
+            await add_to_history(text_content)
+            return json_response({
+                'success': True,
+                'text': text_content,
+                'model_used': model_id
+            })
+
+        # Prepare request body for OpenRouter API
+        request_body = _build_request_body(images, user_prompt, model_id, enable_reasoning, stream=False)
+
+        # Serialize once and drop references to the parsed upload so the base64
+        # image strings are not held alongside the payload while awaiting upstream
+        payload = orjson.dumps(request_body)
+        del data, images, request_body
+
+        if not await _acquire_upstream_slot():
+            logger.warning("No upstream slot available, rejecting OCR request")
+            return json_response({'error': 'Server busy, please retry'}, 503)
 
         logger.info(f"Sending request to OpenRouter API with model: {model_id}")
-        response = requests.post(
-            'https://openrouter.ai/api/v1/chat/completions',
-            headers=headers,
-            json=request_body,
-            timeout=60
-        )
+        try:
+            response = await http_client.post(
+                OPENROUTER_URL,
+                headers=STATIC_HEADERS,
+                content=payload
+            )
+        finally:
+            upstream_slots.release()
 
         if response.status_code != 200:
             logger.error(f"OpenRouter API error: {response.status_code} - {response.text}")
-            return jsonify({
+            return json_response({
                 'error': f'API error: {response.status_code}',
                 'details': response.text[:200]
-            }), 500
+            }, 500)
 
-        result = response.json()
+        result = orjson.loads(response.content)
         text_content = result['choices'][0]['message']['content']
 
         # Remove markers if present
-        begin_marker = "<|begin_of_box|>"
-        end_marker = "<|end_of_box|>"
-        if text_content.startswith(begin_marker) and text_content.endswith(end_marker):
-            text_content = text_content[len(begin_marker):-len(end_marker)]
+        text_content = text_content.removeprefix(BEGIN_MARKER).removesuffix(END_MARKER)
+        _cache_result(cache_key, text_content)
 
         # Add to history
-        add_to_history(text_content)
+        await add_to_history(text_content)
 
-        return jsonify({
+        return json_response({
             'success': True,
             'text': text_content,
             'model_used': model_id
         })
 
-    except requests.exceptions.Timeout:
+    except RequestEntityTooLarge:
+        # Raised by Quart while reading a body larger than MAX_CONTENT_LENGTH
+        return json_response({'error': 'Images too large'}, 413)
+    except httpx.TimeoutException:
         logger.error("OpenRouter API timeout")
-        return jsonify({'error': 'API timeout'}), 504
-    except requests.exceptions.RequestException as e:
+        return json_response({'error': 'API timeout'}, 504)
+    except httpx.HTTPError as e:
         logger.error(f"Request error: {e}")
-        return jsonify({'error': f'Request failed: {str(e)}'}), 500
+        return json_response({'error': f'Request failed: {str(e)}'}, 500)
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
-        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+        return json_response({'error': f'Internal server error: {str(e)}'}, 500)
 
 @app.route('/api/stream_recognize', methods=['POST'])
-def stream_recognize():
+async def stream_recognize():
     """Stream OCR results (real-time streaming proxy)"""
     try:
-        data = request.json
+        data = await _get_json_body()
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return json_response({'error': 'No data provided'}, 400)
 
         images = data.get('images', [])
         user_prompt = data.get('prompt', '')
-        model_id = data.get('model', config.get('default_model'))
-        enable_reasoning = data.get('enable_reasoning', config.get('enable_reasoning_by_default', True))
+        model_id = data.get('model', DEFAULT_MODEL)
+        enable_reasoning = data.get('enable_reasoning', DEFAULT_REASONING)
 
         if not images:
-            return jsonify({'error': 'No images provided'}), 400
-
-        # Prepare messages for OpenRouter API
-        messages = [
-            {
-                'role': 'system',
-                'content': config.get('system_prompt', '')
-            },
-            {
-                'role': 'user',
-                'content': [
-                    {'type': 'text', 'text': user_prompt or 'Extract text'},
-                    *[{'type': 'image_url', 'image_url': {'url': img}} for img in images]
-                ]
-            }
-        ]
+            return json_response({'error': 'No images provided'}, 400)
+
+        error_response = _check_images(images)
+        if error_response is not None:
+            return error_response
+
+        # Replay a previously completed stream for identical input
+        cache_key = _result_cache_key(images, user_prompt, model_id, enable_reasoning, stream=True)
+        cached_stream = result_cache.get(cache_key)
+        if cached_stream is not None:
+            logger.info(f"Serving cached OCR stream for model: {model_id}")
+            return app.response_class(cached_stream, mimetype='text/event-stream')
 
         # Prepare request body with streaming enabled
-        request_body = {
-            'model': model_id,
-            'messages': messages,
-            'stream': True
-        }
-
-        # Add reasoning if enabled
-        if enable_reasoning:
-            request_body['reasoning'] = {'enabled': True}
-
-        # Make streaming request to OpenRouter API
-        headers = {
-            'Authorization': f'Bearer {config.get("api_key")}',
-            'Content-Type': 'application/json',
-            'HTTP-Referer': config.get('http_referer', 'https://aiocr.app'),
-            'X-Title': config.get('x_title', 'AI OCR Tool')
-        }
+        request_body = _build_request_body(images, user_prompt, model_id, enable_reasoning, stream=True)
+
+        # Serialize once and release the parsed upload before streaming upstream
+        payload = orjson.dumps(request_body)
+        del data, images, request_body
 
         logger.info(f"Streaming request to OpenRouter API with model: {model_id}")
 
-        # Stream the response
-        response = requests.post(
-            'https://openrouter.ai/api/v1/chat/completions',
-            headers=headers,
-            json=request_body,
-            stream=True,
-            timeout=60
+        if not await _acquire_upstream_slot():
+            logger.warning("No upstream slot available, rejecting streaming request")
+            return json_response({'error': 'Server busy, please retry'}, 503)
+
+        # Stream the response; the slot is held until the stream is closed
+        upstream_request = http_client.build_request(
+            'POST',
+            OPENROUTER_URL,
+            headers=STATIC_HEADERS,
+            content=payload
         )
+        try:
+            response = await http_client.send(upstream_request, stream=True)
+        except BaseException:
+            upstream_slots.release()
+            raise
 
         if response.status_code != 200:
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+                upstream_slots.release()
             logger.error(f"OpenRouter API error: {response.status_code} - {response.text}")
-            return jsonify({
+            return json_response({
                 'error': f'API error: {response.status_code}',
                 'details': response.text[:200]
-            }), 500
+            }, 500)
 
-        # Create a generator to stream the response
-        def generate():
-            for chunk in response.iter_lines():
-                if chunk:
-                    yield chunk + b'\n'
-
-        return app.response_class(generate(), mimetype='text/event-stream')
+        return app.response_class(
+            UpstreamStream(response, cache_key),
+            mimetype='text/event-stream',
+            headers={'X-Accel-Buffering': 'no'}
+        )
 
+    except RequestEntityTooLarge:
+        return json_response({'error': 'Images too large'}, 413)
     except Exception as e:
         logger.error(f"Streaming error: {e}")
-        return jsonify({'error': f'Streaming failed: {str(e)}'}), 500
+        return json_response({'error': f'Streaming failed: {str(e)}'}, 500)
 
 if __name__ == '__main__':
-    from datetime import datetime
-    app.run(debug=True, host='0.0.0.0', port=1203)
\ No newline at end of file
+    import uvicorn
+    # Workers are separate processes, so hand them one generated key via the environment
+    os.environ.setdefault('AI-OCR_SECRET_KEY', os.urandom(24).hex())
+    # In-memory history is per process, so only fan out across cores when it is shared via Redis
+    default_workers = (os.cpu_count() or 1) if REDIS_URL else 1
+    uvicorn.run('app:app',
+                app_dir=os.path.dirname(os.path.abspath(__file__)),
+                host='0.0.0.0',
+                port=1203,
+                loop='auto',  # uvloop when installed
+                http='auto',  # httptools when installed
+                workers=int(os.environ.get('WEB_CONCURRENCY', default_workers)))
\ No newline at end of file